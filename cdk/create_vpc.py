@@ -5,47 +5,108 @@ Creates a VPC with 3 public and 3 private subnets across 3 AZs with 1 NAT Gatewa
 """
 
 import boto3
+import ipaddress
+import itertools
+import json
+import logging
+import multiprocessing
+import os
 import sys
-from botocore.exceptions import ClientError
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from botocore.config import Config
+from botocore.exceptions import ClientError, WaiterError
+
+logger = logging.getLogger('vpc')
+
+# Room for the threaded fan-out (urllib3 defaults to 10 connections) and
+# adaptive retries so throttled calls back off instead of failing
+CLIENT_CONFIG = Config(
+    max_pool_connections=32,
+    retries={'mode': 'adaptive', 'max_attempts': 10}
+)
+
+# CloudFormation template describing the same VPC layout as VPCCreator
+TEMPLATE_PATH = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), '..', 'vpc', 'vpc-template.yaml'
+)
+
+# Written by create_infrastructure next to the scripts so delete_vpc.py can
+# skip describe calls regardless of the working directory
+MANIFEST_FILE = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), '.vpc_manifest_{vpc_id}.json'
+)
+
+# Availability zones per region; effectively static, so look them up once
+_AZ_CACHE = {}
+
+def _azs_for_region(ec2, region):
+    """Return the availability zones for a region, cached per process"""
+    if region not in _AZ_CACHE:
+        _AZ_CACHE[region] = ec2.describe_availability_zones()['AvailabilityZones']
+    return _AZ_CACHE[region]
+
+def _subnet_cidrs(cidr):
+    """Derive the public and private /24s from a VPC CIDR
+    
+    Uses the same layout as the defaults: the 2nd-4th /24 blocks are public
+    and the 12th-14th are private (10.0.1-3.0/24 and 10.0.11-13.0/24 for
+    10.0.0.0/16).
+    """
+    network = ipaddress.ip_network(cidr)
+    if network.prefixlen > 20:
+        raise ValueError(f"VPC CIDR {cidr} is too small; at least a /20 is required")
+    blocks = [str(block) for block in itertools.islice(network.subnets(new_prefix=24), 14)]
+    return blocks[1:4], blocks[11:14]
 
 class VPCCreator:
     def __init__(self, region='ap-south-1', environment='Production'):
-        self.ec2 = boto3.client('ec2', region_name=region)
+        self.ec2 = boto3.Session().client('ec2', region_name=region, config=CLIENT_CONFIG)
         self.region = region
         self.environment = environment
         self.vpc_id = None
         self.igw_id = None
         self.nat_gateway_id = None
+        self.allocation_id = None
         self.public_subnets = []
         self.private_subnets = []
+        self.route_tables = {}
+        
+        # Tag specifications are fixed per environment, so build them once
+        self._tag_tpl = {
+            key: [{
+                'ResourceType': resource_type,
+                'Tags': [{'Key': 'Name', 'Value': f'{environment}-{suffix}'}]
+            }]
+            for key, resource_type, suffix in [
+                ('vpc', 'vpc', 'VPC'),
+                ('igw', 'internet-gateway', 'IGW'),
+                ('eip', 'elastic-ip', 'NAT-EIP'),
+                ('nat', 'natgateway', 'NAT'),
+                ('public-rt', 'route-table', 'Public-RT'),
+                ('private-rt', 'route-table', 'Private-RT')
+            ]
+        }
         
     def create_vpc(self, cidr='10.0.0.0/16'):
         """Create VPC"""
-        print(f"Creating VPC with CIDR {cidr}...")
+        logger.info("Creating VPC with CIDR %s...", cidr)
         response = self.ec2.create_vpc(
             CidrBlock=cidr,
-            TagSpecifications=[{
-                'ResourceType': 'vpc',
-                'Tags': [{'Key': 'Name', 'Value': f'{self.environment}-VPC'}]
-            }]
+            TagSpecifications=self._tag_tpl['vpc']
         )
         self.vpc_id = response['Vpc']['VpcId']
         
-        # Enable DNS hostnames
+        # Enable DNS hostnames (DNS support is already enabled by default)
         self.ec2.modify_vpc_attribute(VpcId=self.vpc_id, EnableDnsHostnames={'Value': True})
-        self.ec2.modify_vpc_attribute(VpcId=self.vpc_id, EnableDnsSupport={'Value': True})
         
-        print(f"VPC created: {self.vpc_id}")
+        logger.info("VPC created: %s", self.vpc_id)
         return self.vpc_id
     
     def create_internet_gateway(self):
         """Create and attach Internet Gateway"""
-        print("Creating Internet Gateway...")
+        logger.info("Creating Internet Gateway...")
         response = self.ec2.create_internet_gateway(
-            TagSpecifications=[{
-                'ResourceType': 'internet-gateway',
-                'Tags': [{'Key': 'Name', 'Value': f'{self.environment}-IGW'}]
-            }]
+            TagSpecifications=self._tag_tpl['igw']
         )
         self.igw_id = response['InternetGateway']['InternetGatewayId']
         
@@ -53,97 +114,123 @@ class VPCCreator:
             InternetGatewayId=self.igw_id,
             VpcId=self.vpc_id
         )
-        print(f"Internet Gateway created and attached: {self.igw_id}")
+        logger.info("Internet Gateway created and attached: %s", self.igw_id)
         return self.igw_id
     
-    def create_subnets(self):
-        """Create public and private subnets"""
-        azs = self.ec2.describe_availability_zones()['AvailabilityZones'][:3]
-        
-        public_cidrs = ['10.0.1.0/24', '10.0.2.0/24', '10.0.3.0/24']
-        private_cidrs = ['10.0.11.0/24', '10.0.12.0/24', '10.0.13.0/24']
+    def _create_one_subnet(self, az, cidr, name, is_public):
+        """Create a single subnet, enabling auto-assign public IP if public"""
+        logger.info("Creating %s...", name)
+        response = self.ec2.create_subnet(
+            VpcId=self.vpc_id,
+            CidrBlock=cidr,
+            AvailabilityZone=az,
+            TagSpecifications=[{
+                'ResourceType': 'subnet',
+                'Tags': [{'Key': 'Name', 'Value': name}]
+            }]
+        )
+        subnet_id = response['Subnet']['SubnetId']
         
-        # Create public subnets
-        for i, (az, cidr) in enumerate(zip(azs, public_cidrs), 1):
-            print(f"Creating Public Subnet {i}...")
-            response = self.ec2.create_subnet(
-                VpcId=self.vpc_id,
-                CidrBlock=cidr,
-                AvailabilityZone=az['ZoneName'],
-                TagSpecifications=[{
-                    'ResourceType': 'subnet',
-                    'Tags': [{'Key': 'Name', 'Value': f'{self.environment}-Public-Subnet-AZ{i}'}]
-                }]
-            )
-            subnet_id = response['Subnet']['SubnetId']
-            self.public_subnets.append(subnet_id)
-            
+        if is_public:
             # Enable auto-assign public IP
             self.ec2.modify_subnet_attribute(
                 SubnetId=subnet_id,
                 MapPublicIpOnLaunch={'Value': True}
             )
-            print(f"Public Subnet {i} created: {subnet_id}")
+        logger.info("%s created: %s", name, subnet_id)
+        return subnet_id
+    
+    def create_subnets(self, cidr='10.0.0.0/16'):
+        """Create public and private subnets concurrently"""
+        azs = _azs_for_region(self.ec2, self.region)[:3]
+        
+        public_cidrs, private_cidrs = _subnet_cidrs(cidr)
         
-        # Create private subnets
+        specs = []
+        for i, (az, cidr) in enumerate(zip(azs, public_cidrs), 1):
+            specs.append((az['ZoneName'], cidr, f'{self.environment}-Public-Subnet-AZ{i}', True))
         for i, (az, cidr) in enumerate(zip(azs, private_cidrs), 1):
-            print(f"Creating Private Subnet {i}...")
-            response = self.ec2.create_subnet(
-                VpcId=self.vpc_id,
-                CidrBlock=cidr,
-                AvailabilityZone=az['ZoneName'],
-                TagSpecifications=[{
-                    'ResourceType': 'subnet',
-                    'Tags': [{'Key': 'Name', 'Value': f'{self.environment}-Private-Subnet-AZ{i}'}]
-                }]
-            )
-            subnet_id = response['Subnet']['SubnetId']
-            self.private_subnets.append(subnet_id)
-            print(f"Private Subnet {i} created: {subnet_id}")
+            specs.append((az['ZoneName'], cidr, f'{self.environment}-Private-Subnet-AZ{i}', False))
+        
+        # Each subnet is an independent API round trip; the boto3 client is
+        # thread-safe, so fan the calls out and collect IDs in spec order.
+        subnet_ids = [None] * len(specs)
+        with ThreadPoolExecutor(max_workers=6) as executor:
+            futures = {
+                executor.submit(self._create_one_subnet, *spec): index
+                for index, spec in enumerate(specs)
+            }
+            for future in as_completed(futures):
+                subnet_ids[futures[future]] = future.result()
+        
+        for (_, _, _, is_public), subnet_id in zip(specs, subnet_ids):
+            if is_public:
+                self.public_subnets.append(subnet_id)
+            else:
+                self.private_subnets.append(subnet_id)
     
-    def create_nat_gateway(self):
-        """Create NAT Gateway with Elastic IP"""
-        print("Allocating Elastic IP...")
+    def allocate_address(self):
+        """Allocate Elastic IP for the NAT Gateway"""
+        logger.info("Allocating Elastic IP...")
         eip_response = self.ec2.allocate_address(
             Domain='vpc',
-            TagSpecifications=[{
-                'ResourceType': 'elastic-ip',
-                'Tags': [{'Key': 'Name', 'Value': f'{self.environment}-NAT-EIP'}]
-            }]
+            TagSpecifications=self._tag_tpl['eip']
         )
-        allocation_id = eip_response['AllocationId']
-        print(f"Elastic IP allocated: {eip_response['PublicIp']}")
+        self.allocation_id = eip_response['AllocationId']
+        logger.info("Elastic IP allocated: %s", eip_response['PublicIp'])
+        return self.allocation_id
+    
+    def create_nat_gateway(self, allocation_id=None):
+        """Create NAT Gateway, allocating an Elastic IP if none is given"""
+        if allocation_id is None:
+            allocation_id = self.allocate_address()
         
-        print("Creating NAT Gateway...")
+        logger.info("Creating NAT Gateway...")
         response = self.ec2.create_nat_gateway(
             SubnetId=self.public_subnets[0],
             AllocationId=allocation_id,
-            TagSpecifications=[{
-                'ResourceType': 'natgateway',
-                'Tags': [{'Key': 'Name', 'Value': f'{self.environment}-NAT'}]
-            }]
+            TagSpecifications=self._tag_tpl['nat']
         )
         self.nat_gateway_id = response['NatGateway']['NatGatewayId']
-        print(f"NAT Gateway created: {self.nat_gateway_id}")
+        logger.info("NAT Gateway created: %s", self.nat_gateway_id)
         
         # Wait for NAT Gateway to be available
-        print("Waiting for NAT Gateway to become available...")
+        logger.info("Waiting for NAT Gateway to become available...")
+        # Poll every 5s rather than the default 15s; a typical 90s transition
+        # costs ~18 describe calls instead of ~6, well below throttle limits
         waiter = self.ec2.get_waiter('nat_gateway_available')
-        waiter.wait(NatGatewayIds=[self.nat_gateway_id])
-        print("NAT Gateway is now available")
+        waiter.wait(
+            NatGatewayIds=[self.nat_gateway_id],
+            WaiterConfig={'Delay': 5, 'MaxAttempts': 60}
+        )
+        logger.info("NAT Gateway is now available")
         
         return self.nat_gateway_id
     
+    def _associate_subnets(self, executor, route_table_id, subnet_ids):
+        """Associate subnets with a route table concurrently"""
+        responses = executor.map(
+            lambda subnet_id: self.ec2.associate_route_table(
+                RouteTableId=route_table_id,
+                SubnetId=subnet_id
+            ),
+            subnet_ids
+        )
+        self.route_tables[route_table_id] = [r['AssociationId'] for r in responses]
+    
     def create_route_tables(self):
         """Create and configure route tables"""
+        with ThreadPoolExecutor(max_workers=6) as executor:
+            self._create_public_route_table(executor)
+            self._create_private_route_table(executor)
+    
+    def _create_public_route_table(self, executor):
+        """Create public route table routed through the Internet Gateway"""
         # Create public route table
-        print("Creating Public Route Table...")
+        logger.info("Creating Public Route Table...")
         public_rt_response = self.ec2.create_route_table(
             VpcId=self.vpc_id,
-            TagSpecifications=[{
-                'ResourceType': 'route-table',
-                'Tags': [{'Key': 'Name', 'Value': f'{self.environment}-Public-RT'}]
-            }]
+            TagSpecifications=self._tag_tpl['public-rt']
         )
         public_rt_id = public_rt_response['RouteTable']['RouteTableId']
         
@@ -155,21 +242,16 @@ class VPCCreator:
         )
         
         # Associate public subnets
-        for subnet_id in self.public_subnets:
-            self.ec2.associate_route_table(
-                RouteTableId=public_rt_id,
-                SubnetId=subnet_id
-            )
-        print(f"Public Route Table created and associated: {public_rt_id}")
-        
-        # Create private route table
-        print("Creating Private Route Table...")
+        self._associate_subnets(executor, public_rt_id, self.public_subnets)
+        logger.info("Public Route Table created and associated: %s", public_rt_id)
+        return public_rt_id
+    
+    def _create_private_route_table(self, executor):
+        """Create private route table routed through the NAT Gateway"""
+        logger.info("Creating Private Route Table...")
         private_rt_response = self.ec2.create_route_table(
             VpcId=self.vpc_id,
-            TagSpecifications=[{
-                'ResourceType': 'route-table',
-                'Tags': [{'Key': 'Name', 'Value': f'{self.environment}-Private-RT'}]
-            }]
+            TagSpecifications=self._tag_tpl['private-rt']
         )
         private_rt_id = private_rt_response['RouteTable']['RouteTableId']
         
@@ -181,53 +263,162 @@ class VPCCreator:
         )
         
         # Associate private subnets
-        for subnet_id in self.private_subnets:
-            self.ec2.associate_route_table(
-                RouteTableId=private_rt_id,
-                SubnetId=subnet_id
-            )
-        print(f"Private Route Table created and associated: {private_rt_id}")
+        self._associate_subnets(executor, private_rt_id, self.private_subnets)
+        logger.info("Private Route Table created and associated: %s", private_rt_id)
+        return private_rt_id
+    
+    def _report(self):
+        """Log a summary of the created resources and return their IDs"""
+        logger.info("\n" + "="*60)
+        logger.info("VPC Infrastructure Created Successfully!")
+        logger.info("="*60)
+        logger.info("VPC ID: %s", self.vpc_id)
+        logger.info("Internet Gateway: %s", self.igw_id)
+        logger.info("NAT Gateway: %s", self.nat_gateway_id)
+        logger.info("Public Subnets: %s", ', '.join(self.public_subnets))
+        logger.info("Private Subnets: %s", ', '.join(self.private_subnets))
+        logger.info("="*60)
+        
+        return {
+            'vpc_id': self.vpc_id,
+            'igw_id': self.igw_id,
+            'nat_gateway_id': self.nat_gateway_id,
+            'public_subnets': self.public_subnets,
+            'private_subnets': self.private_subnets
+        }
     
-    def create_infrastructure(self):
+    def _write_manifest(self, result):
+        """Persist resource IDs so the delete path can skip describe calls"""
+        path = MANIFEST_FILE.format(vpc_id=self.vpc_id)
+        try:
+            with open(path, 'w') as f:
+                json.dump(result, f, indent=2)
+        except OSError as e:
+            # The VPC exists regardless; delete_vpc.py falls back to describes
+            logger.warning("Could not write manifest %s: %s", path, e)
+            return
+        logger.info("Manifest written: %s", path)
+    
+    def create_infrastructure(self, cidr='10.0.0.0/16'):
         """Create complete VPC infrastructure"""
         try:
-            self.create_vpc()
-            self.create_internet_gateway()
-            self.create_subnets()
-            self.create_nat_gateway()
+            # Reject an unusable CIDR before anything is created
+            _subnet_cidrs(cidr)
+            self.create_vpc(cidr)
+            
+            # IGW, subnets and the EIP only depend on the VPC, so create them
+            # concurrently; the NAT Gateway needs a public subnet, the EIP and
+            # an attached IGW (AWS rejects public NAT Gateways without one).
+            with ThreadPoolExecutor(max_workers=3) as executor:
+                igw_future = executor.submit(self.create_internet_gateway)
+                subnets_future = executor.submit(self.create_subnets, cidr)
+                eip_future = executor.submit(self.allocate_address)
+                
+                igw_future.result()
+                subnets_future.result()
+                self.create_nat_gateway(allocation_id=eip_future.result())
+            
             self.create_route_tables()
             
-            print("\n" + "="*60)
-            print("VPC Infrastructure Created Successfully!")
-            print("="*60)
-            print(f"VPC ID: {self.vpc_id}")
-            print(f"Internet Gateway: {self.igw_id}")
-            print(f"NAT Gateway: {self.nat_gateway_id}")
-            print(f"Public Subnets: {', '.join(self.public_subnets)}")
-            print(f"Private Subnets: {', '.join(self.private_subnets)}")
-            print("="*60)
+            result = self._report()
+            result['allocation_id'] = self.allocation_id
+            result['route_tables'] = self.route_tables
+            self._write_manifest(result)
+            return result
             
-            return {
-                'vpc_id': self.vpc_id,
-                'igw_id': self.igw_id,
-                'nat_gateway_id': self.nat_gateway_id,
-                'public_subnets': self.public_subnets,
-                'private_subnets': self.private_subnets
-            }
+        except (ClientError, WaiterError, ValueError) as e:
+            logger.error("Error: %s", e)
+            sys.exit(1)
+    
+    def create_infrastructure_via_cfn(self, cidr='10.0.0.0/16', stack_name=None):
+        """Create complete VPC infrastructure as a CloudFormation stack"""
+        stack_name = stack_name or f'{self.environment}-VPC'
+        cfn = boto3.Session().client('cloudformation', region_name=self.region, config=CLIENT_CONFIG)
+        
+        try:
+            public_cidrs, private_cidrs = _subnet_cidrs(cidr)
+            with open(TEMPLATE_PATH) as f:
+                template_body = f.read()
             
-        except ClientError as e:
-            print(f"Error: {e}")
+            logger.info("Creating CloudFormation stack %s...", stack_name)
+            cfn.create_stack(
+                StackName=stack_name,
+                TemplateBody=template_body,
+                Parameters=[
+                    {'ParameterKey': 'EnvironmentName', 'ParameterValue': self.environment},
+                    {'ParameterKey': 'VpcCIDR', 'ParameterValue': cidr}
+                ] + [
+                    {'ParameterKey': f'PublicSubnet{i}CIDR', 'ParameterValue': subnet_cidr}
+                    for i, subnet_cidr in enumerate(public_cidrs, 1)
+                ] + [
+                    {'ParameterKey': f'PrivateSubnet{i}CIDR', 'ParameterValue': subnet_cidr}
+                    for i, subnet_cidr in enumerate(private_cidrs, 1)
+                ]
+            )
+            
+            logger.info("Waiting for stack creation to complete...")
+            waiter = cfn.get_waiter('stack_create_complete')
+            waiter.wait(StackName=stack_name, WaiterConfig={'Delay': 10, 'MaxAttempts': 90})
+            
+            stack = cfn.describe_stacks(StackName=stack_name)['Stacks'][0]
+            outputs = {o['OutputKey']: o['OutputValue'] for o in stack['Outputs']}
+            self.vpc_id = outputs['VPCId']
+            self.nat_gateway_id = outputs['NatGateway']
+            self.public_subnets = outputs['PublicSubnets'].split(',')
+            self.private_subnets = outputs['PrivateSubnets'].split(',')
+            self.igw_id = cfn.describe_stack_resource(
+                StackName=stack_name,
+                LogicalResourceId='InternetGateway'
+            )['StackResourceDetail']['PhysicalResourceId']
+            
+            result = self._report()
+            result['stack_name'] = stack_name
+            return result
+            
+        except (ClientError, WaiterError, ValueError) as e:
+            logger.error("Error: %s", e)
             sys.exit(1)
 
+def _create_one(spec):
+    """Create one VPC in a worker process; returns None if creation failed"""
+    # Each worker builds its own boto3 session after the fork
+    try:
+        return VPCCreator(**spec).create_infrastructure()
+    except SystemExit:
+        # create_infrastructure exits on AWS errors; the error is already
+        # logged, and letting SystemExit escape would hang the pool
+        return None
+    except Exception as e:
+        # Don't let one failed VPC discard the other workers' results
+        logger.error("Error creating VPC for %s: %s", spec, e)
+        return None
+
+def create_many(specs):
+    """Create several VPCs in parallel, one process per VPCCreator spec
+    
+    Each spec is a dict of VPCCreator arguments, e.g.
+    {'region': 'us-east-1', 'environment': 'Staging'}.
+    """
+    if not specs:
+        return []
+    with multiprocessing.Pool(min(8, len(specs))) as pool:
+        return pool.map(_create_one, specs)
+
 if __name__ == '__main__':
     import argparse
     
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+    
     parser = argparse.ArgumentParser(description='Create Production VPC Infrastructure')
     parser.add_argument('--region', default='ap-south-1', help='AWS Region (default: ap-south-1)')
     parser.add_argument('--environment', default='Production', help='Environment name (default: Production)')
     parser.add_argument('--cidr', default='10.0.0.0/16', help='VPC CIDR block (default: 10.0.0.0/16)')
+    parser.add_argument('--use-cloudformation', action='store_true', help='Create the VPC as a CloudFormation stack')
     
     args = parser.parse_args()
     
     creator = VPCCreator(region=args.region, environment=args.environment)
-    creator.create_infrastructure()
+    if args.use_cloudformation:
+        creator.create_infrastructure_via_cfn(cidr=args.cidr)
+    else:
+        creator.create_infrastructure(cidr=args.cidr)
@@ -4,89 +4,276 @@ Delete VPC and all associated resources
 """
 
 import boto3
-import time
+import json
+import logging
+import os
 import sys
+from concurrent.futures import ThreadPoolExecutor
+from botocore.exceptions import ClientError
+from create_vpc import CLIENT_CONFIG, MANIFEST_FILE
 
-def delete_vpc_infrastructure(vpc_id, region='ap-south-1'):
-    ec2 = boto3.client('ec2', region_name=region)
-    
-    print(f"Deleting VPC: {vpc_id}")
-    
+logger = logging.getLogger('vpc')
+
+# Error codes meaning the resource is already gone, e.g. when re-running
+# after a partial failure left the manifest in place
+ALREADY_DELETED_CODES = {
+    'NatGatewayNotFound',
+    'InvalidAllocationID.NotFound',
+    'InvalidRouteTableID.NotFound',
+    'InvalidAssociationID.NotFound',
+    'InvalidSubnetID.NotFound',
+    'InvalidInternetGatewayID.NotFound',
+    'Gateway.NotAttached'
+}
+
+def _load_manifest(vpc_id):
+    """Return the manifest written by create_vpc.py, or None if absent"""
+    path = MANIFEST_FILE.format(vpc_id=vpc_id)
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+def _describe_all(ec2, operation, key, **kwargs):
+    """Yield every item of a paginated describe call"""
+    for page in ec2.get_paginator(operation).paginate(**kwargs):
+        yield from page[key]
+
+def _delete(func, **kwargs):
+    """Call a delete-style API, treating an already-deleted resource as done"""
     try:
-        # Delete NAT Gateways
-        print("Deleting NAT Gateways...")
-        nat_gateways = ec2.describe_nat_gateways(
+        func(**kwargs)
+    except ClientError as e:
+        if e.response['Error']['Code'] not in ALREADY_DELETED_CODES:
+            raise
+        logger.info("  Already deleted: %s", kwargs)
+
+def _run_concurrently(func, items):
+    """Apply func to each item on a thread pool, re-raising the first error"""
+    if not items:
+        return []
+    with ThreadPoolExecutor(max_workers=min(16, len(items))) as executor:
+        return list(executor.map(func, items))
+
+def _delete_nat_gateways_and_release_eips(ec2, vpc_id, environment, manifest=None):
+    """Delete NAT Gateways, wait for them to go away, then release Elastic IPs"""
+    logger.info("Deleting NAT Gateways...")
+    if manifest:
+        nat_gateway_ids = [manifest['nat_gateway_id']]
+    else:
+        nat_gateways = _describe_all(
+            ec2, 'describe_nat_gateways', 'NatGateways',
             Filters=[{'Name': 'vpc-id', 'Values': [vpc_id]}]
-        )['NatGateways']
-        
-        for nat in nat_gateways:
-            if nat['State'] != 'deleted':
-                print(f"  Deleting NAT Gateway: {nat['NatGatewayId']}")
-                ec2.delete_nat_gateway(NatGatewayId=nat['NatGatewayId'])
-        
-        if nat_gateways:
-            print("  Waiting for NAT Gateways to delete (this takes 1-2 minutes)...")
-            time.sleep(90)
-        
-        # Release Elastic IPs
-        print("Releasing Elastic IPs...")
+        )
+        nat_gateway_ids = [
+            nat['NatGatewayId'] for nat in nat_gateways if nat['State'] != 'deleted'
+        ]
+    for nat_gateway_id in nat_gateway_ids:
+        logger.info("  Deleting NAT Gateway: %s", nat_gateway_id)
+        _delete(ec2.delete_nat_gateway, NatGatewayId=nat_gateway_id)
+    
+    if nat_gateway_ids:
+        logger.info("  Waiting for NAT Gateways to delete (this takes 1-2 minutes)...")
+        waiter = ec2.get_waiter('nat_gateway_deleted')
+        waiter.wait(
+            NatGatewayIds=nat_gateway_ids,
+            WaiterConfig={'Delay': 5, 'MaxAttempts': 40}
+        )
+    
+    # NAT Gateway EIPs only become releasable once the gateway is gone
+    logger.info("Releasing Elastic IPs...")
+    if manifest:
+        allocation_ids = [manifest['allocation_id']]
+    else:
+        # Only consider the EIP tagged by create_vpc.py, not every EIP in the
+        # account (DescribeAddresses is not paginated)
         addresses = ec2.describe_addresses(
-            Filters=[{'Name': 'domain', 'Values': ['vpc']}]
+            Filters=[{'Name': 'tag:Name', 'Values': [f'{environment}-NAT-EIP']}]
         )['Addresses']
-        
-        for addr in addresses:
-            if 'NetworkInterfaceId' not in addr:
-                print(f"  Releasing EIP: {addr['PublicIp']}")
-                ec2.release_address(AllocationId=addr['AllocationId'])
-        
-        # Delete subnets
-        print("Deleting Subnets...")
-        subnets = ec2.describe_subnets(
-            Filters=[{'Name': 'vpc-id', 'Values': [vpc_id]}]
-        )['Subnets']
-        
-        for subnet in subnets:
-            print(f"  Deleting Subnet: {subnet['SubnetId']}")
-            ec2.delete_subnet(SubnetId=subnet['SubnetId'])
-        
-        # Delete route tables (except main)
-        print("Deleting Route Tables...")
-        route_tables = ec2.describe_route_tables(
+        allocation_ids = [
+            addr['AllocationId'] for addr in addresses if 'NetworkInterfaceId' not in addr
+        ]
+    
+    def release_address(allocation_id):
+        logger.info("  Releasing EIP: %s", allocation_id)
+        _delete(ec2.release_address, AllocationId=allocation_id)
+    
+    _run_concurrently(release_address, allocation_ids)
+
+def _delete_route_tables(ec2, vpc_id, environment, manifest=None):
+    """Disassociate and delete the route tables created by create_vpc.py"""
+    logger.info("Deleting Route Tables...")
+    if manifest:
+        route_tables = manifest['route_tables']
+    else:
+        # Match on the Name tags set by create_vpc.py; this skips the main
+        # route table and any route tables added outside these scripts
+        route_tables = {
+            rt['RouteTableId']: [
+                assoc['RouteTableAssociationId'] for assoc in rt.get('Associations', [])
+            ]
+            for rt in _describe_all(
+                ec2, 'describe_route_tables', 'RouteTables',
+                Filters=[
+                    {'Name': 'vpc-id', 'Values': [vpc_id]},
+                    {'Name': 'tag:Name', 'Values': [
+                        f'{environment}-Public-RT', f'{environment}-Private-RT'
+                    ]}
+                ]
+            )
+        }
+        if not route_tables:
+            logger.warning(
+                "No route tables tagged %s-Public-RT/%s-Private-RT found in %s",
+                environment, environment, vpc_id
+            )
+    
+    def delete_route_table(item):
+        route_table_id, association_ids = item
+        # Subnets still exist at this point, so drop their associations first
+        for association_id in association_ids:
+            _delete(ec2.disassociate_route_table, AssociationId=association_id)
+        logger.info("  Deleting Route Table: %s", route_table_id)
+        _delete(ec2.delete_route_table, RouteTableId=route_table_id)
+    
+    _run_concurrently(delete_route_table, list(route_tables.items()))
+
+def _delete_subnets(ec2, vpc_id):
+    """Delete all subnets in the VPC"""
+    logger.info("Deleting Subnets...")
+    # Always describe: subnets added after creation are not in the manifest
+    # and would block delete_vpc
+    subnet_ids = [
+        subnet['SubnetId'] for subnet in _describe_all(
+            ec2, 'describe_subnets', 'Subnets',
             Filters=[{'Name': 'vpc-id', 'Values': [vpc_id]}]
-        )['RouteTables']
-        
-        for rt in route_tables:
-            if not any(assoc.get('Main') for assoc in rt.get('Associations', [])):
-                print(f"  Deleting Route Table: {rt['RouteTableId']}")
-                ec2.delete_route_table(RouteTableId=rt['RouteTableId'])
-        
-        # Detach and delete Internet Gateways
-        print("Deleting Internet Gateways...")
-        igws = ec2.describe_internet_gateways(
-            Filters=[{'Name': 'attachment.vpc-id', 'Values': [vpc_id]}]
-        )['InternetGateways']
+        )
+    ]
+    
+    def delete_subnet(subnet_id):
+        logger.info("  Deleting Subnet: %s", subnet_id)
+        _delete(ec2.delete_subnet, SubnetId=subnet_id)
+    
+    _run_concurrently(delete_subnet, subnet_ids)
+
+def _delete_internet_gateways(ec2, vpc_id, manifest=None):
+    """Detach and delete Internet Gateways attached to the VPC"""
+    logger.info("Deleting Internet Gateways...")
+    if manifest:
+        igw_ids = [manifest['igw_id']]
+    else:
+        igw_ids = [
+            igw['InternetGatewayId'] for igw in _describe_all(
+                ec2, 'describe_internet_gateways', 'InternetGateways',
+                Filters=[{'Name': 'attachment.vpc-id', 'Values': [vpc_id]}]
+            )
+        ]
+    
+    for igw_id in igw_ids:
+        logger.info("  Detaching IGW: %s", igw_id)
+        _delete(
+            ec2.detach_internet_gateway,
+            InternetGatewayId=igw_id,
+            VpcId=vpc_id
+        )
+        logger.info("  Deleting IGW: %s", igw_id)
+        _delete(ec2.delete_internet_gateway, InternetGatewayId=igw_id)
+
+def _environment_for_vpc(ec2, vpc_id):
+    """Recover the environment name from the VPC's '<environment>-VPC' Name tag"""
+    vpc = ec2.describe_vpcs(VpcIds=[vpc_id])['Vpcs'][0]
+    name = next((tag['Value'] for tag in vpc.get('Tags', []) if tag['Key'] == 'Name'), '')
+    if not name.endswith('-VPC'):
+        raise ValueError(
+            f"Cannot determine environment from VPC Name tag {name!r}; pass environment explicitly"
+        )
+    return name[:-len('-VPC')]
+
+def delete_vpc_infrastructure(vpc_id, region='ap-south-1', environment=None):
+    ec2 = boto3.Session().client('ec2', region_name=region, config=CLIENT_CONFIG)
+    
+    logger.info("Deleting VPC: %s", vpc_id)
+    
+    # Use the IDs recorded at creation time when available
+    manifest = _load_manifest(vpc_id)
+    if manifest:
+        logger.info("Using manifest: %s", MANIFEST_FILE.format(vpc_id=vpc_id))
+    
+    try:
+        # The describe fallbacks match resources by their environment Name tags
+        if not manifest and environment is None:
+            environment = _environment_for_vpc(ec2, vpc_id)
+            logger.info("Using environment from VPC Name tag: %s", environment)
         
-        for igw in igws:
-            print(f"  Detaching IGW: {igw['InternetGatewayId']}")
-            ec2.detach_internet_gateway(
-                InternetGatewayId=igw['InternetGatewayId'],
-                VpcId=vpc_id
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            # Route tables do not depend on the NAT Gateways, so tear them
+            # down while the (slow) NAT deletion is in progress
+            nat_future = executor.submit(
+                _delete_nat_gateways_and_release_eips, ec2, vpc_id, environment, manifest
+            )
+            rt_future = executor.submit(
+                _delete_route_tables, ec2, vpc_id, environment, manifest
             )
-            print(f"  Deleting IGW: {igw['InternetGatewayId']}")
-            ec2.delete_internet_gateway(InternetGatewayId=igw['InternetGatewayId'])
+            nat_future.result()
+            rt_future.result()
+            
+            # Subnets and the IGW are only free once the NAT Gateways are gone
+            subnets_future = executor.submit(_delete_subnets, ec2, vpc_id)
+            igw_future = executor.submit(_delete_internet_gateways, ec2, vpc_id, manifest)
+            subnets_future.result()
+            igw_future.result()
         
         # Delete VPC
-        print(f"Deleting VPC: {vpc_id}")
+        logger.info("Deleting VPC: %s", vpc_id)
         ec2.delete_vpc(VpcId=vpc_id)
         
-        print("\n" + "="*60)
-        print("VPC Infrastructure Deleted Successfully!")
-        print("="*60)
+        if manifest:
+            os.remove(MANIFEST_FILE.format(vpc_id=vpc_id))
         
+        logger.info("\n" + "="*60)
+        logger.info("VPC Infrastructure Deleted Successfully!")
+        logger.info("="*60)
+    
     except Exception as e:
-        print(f"Error: {e}")
+        logger.error("Error: %s", e)
+        sys.exit(1)
+
+def delete_vpc_stack(stack_name, region='ap-south-1'):
+    """Delete a VPC created with VPCCreator.create_infrastructure_via_cfn"""
+    cfn = boto3.Session().client('cloudformation', region_name=region, config=CLIENT_CONFIG)
+    
+    logger.info("Deleting CloudFormation stack: %s", stack_name)
+    
+    try:
+        cfn.delete_stack(StackName=stack_name)
+        
+        logger.info("  Waiting for stack deletion to complete...")
+        waiter = cfn.get_waiter('stack_delete_complete')
+        waiter.wait(StackName=stack_name, WaiterConfig={'Delay': 10, 'MaxAttempts': 90})
+        
+        logger.info("\n" + "="*60)
+        logger.info("VPC Infrastructure Deleted Successfully!")
+        logger.info("="*60)
+        
+    except Exception as e:
+        logger.error("Error: %s", e)
         sys.exit(1)
 
 if __name__ == '__main__':
-    vpc_id = 'vpc-0712817f3d1637c90'
-    delete_vpc_infrastructure(vpc_id, region='ap-south-1')
+    import argparse
+    
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+    
+    parser = argparse.ArgumentParser(description='Delete VPC Infrastructure')
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument('--vpc-id', help='VPC created by create_vpc.py to delete')
+    target.add_argument('--stack-name', help='CloudFormation stack created with --use-cloudformation to delete')
+    parser.add_argument('--region', default='ap-south-1', help='AWS Region (default: ap-south-1)')
+    parser.add_argument('--environment', help='Environment name (default: read from the VPC Name tag)')
+    
+    args = parser.parse_args()
+    
+    if args.stack_name:
+        delete_vpc_stack(args.stack_name, region=args.region)
+    else:
+        delete_vpc_infrastructure(args.vpc_id, region=args.region, environment=args.environment)